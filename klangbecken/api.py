@@ -1,3 +1,4 @@
+import functools
 import os
 import re
 import subprocess
@@ -189,6 +190,16 @@ def queue_api(player_socket, data_dir):
 ###########################
 # Stand-alone Application #
 ###########################
+@functools.lru_cache(maxsize=None)
+def _ffmpeg_available():
+    # Only probe once, the binary does not come and go while running
+    try:
+        subprocess.check_output("ffmpeg -version".split())
+    except (OSError, subprocess.CalledProcessError):  # pragma: no cover
+        return False
+    return True
+
+
 def development_server(data_dir, player_socket):
     """Construct the stand-alone Klangbecken WSGI application for development.
 
@@ -208,9 +219,7 @@ def development_server(data_dir, player_socket):
 
     # Remove ffmpeg_audio_analyzer from analyzers if binary is not present
     upload_analyzers = DEFAULT_UPLOAD_ANALYZERS[:]
-    try:
-        subprocess.check_output("ffmpeg -version".split())
-    except (OSError, subprocess.CalledProcessError):  # pragma: no cover
+    if not _ffmpeg_available():  # pragma: no cover
         upload_analyzers.remove(ffmpeg_audio_analyzer)
         print(
             "WARNING: ffmpeg binary not found. No audio analysis is performed.",
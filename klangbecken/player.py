@@ -1,3 +1,4 @@
+import functools
 import re
 import socket
 import sys
@@ -68,15 +69,29 @@ class LiquidsoapClient:
 
         Returns the response.
         """
-        self.conn.write(cmd.encode("ascii", "ignore") + b"\r\n")
-        ans = self.conn.read_until(b"\r\nEND")
-        ans = re.sub(b"[\r\n]*END$", b"", ans)
-        ans = re.sub(b"^[\r\n]*", b"", ans)
-        ans = re.subn(b"\r", b"", ans)[0]
-        ans = ans.decode("ascii", "ignore").strip()
-        if hasattr(self, "log"):
-            self.log.append((cmd, ans))
-        return ans
+        return self.commands(cmd)[0]
+
+    def commands(self, *cmds):
+        """Execute multiple Liquidsoap commands in one round trip.
+
+        All commands are sent at once, before reading the responses.
+
+        Returns the list of responses.
+        """
+        self.conn.write(
+            b"".join(cmd.encode("ascii", "ignore") + b"\r\n" for cmd in cmds)
+        )
+        answers = []
+        for cmd in cmds:
+            ans = self.conn.read_until(b"\r\nEND")
+            ans = re.sub(b"[\r\n]*END$", b"", ans)
+            ans = re.sub(b"^[\r\n]*", b"", ans)
+            ans = re.subn(b"\r", b"", ans)[0]
+            ans = ans.decode("ascii", "ignore").strip()
+            if hasattr(self, "log"):
+                self.log.append((cmd, ans))
+            answers.append(ans)
+        return answers
 
     def metadata(self, rid):
         """Query metadata information for a Liquidsoap request[1].
@@ -87,7 +102,7 @@ class LiquidsoapClient:
             in Liquidsoap jargon.
         """
         ans = self.command(f"request.metadata {rid}")
-        return dict(re.findall(metadata_re, ans))
+        return dict(_parse_metadata(ans))
 
     def info(self):
         """Query general information about the state of the player.
@@ -99,18 +114,24 @@ class LiquidsoapClient:
         """
         from . import __version__
 
+        uptime, version, on_air, queue = self.commands(
+            "uptime", "version", "klangbecken.on_air", "queue.queue"
+        )
         info = {
-            "uptime": self.command("uptime"),
-            "liquidsoap_version": self.command("version"),
+            "uptime": uptime,
+            "liquidsoap_version": version,
             "api_version": __version__,
             "python_version": sys.version.split()[0],
         }
-        on_air = self.command("klangbecken.on_air").lower() == "true"
+        on_air = on_air.lower() == "true"
         info["on_air"] = on_air
 
         if on_air:
-            for playlist in PLAYLISTS:
-                lines = self.command(f"{playlist}.next").strip().split("\n")
+            *nexts, on_air_rid = self.commands(
+                *(f"{playlist}.next" for playlist in PLAYLISTS), "request.on_air"
+            )
+            for playlist, next_ in zip(PLAYLISTS, nexts):
+                lines = next_.strip().split("\n")
                 lines = [
                     line for line in lines if line and not line.startswith("[playing] ")
                 ]
@@ -120,7 +141,7 @@ class LiquidsoapClient:
                 info[playlist] = ""
 
         if on_air:
-            on_air_rid = self.command("request.on_air").strip()
+            on_air_rid = on_air_rid.strip()
             if on_air_rid:
                 metadata = self.metadata(on_air_rid)
                 info["current_track"] = {
@@ -130,9 +151,7 @@ class LiquidsoapClient:
             else:
                 info["current_track"] = {}
 
-        queue = (
-            self.metadata(rid) for rid in self.command("queue.queue").strip().split()
-        )
+        queue = (self.metadata(rid) for rid in queue.strip().split())
 
         queue = (entry for entry in queue if entry["status"] == "ready")
         entry = next(queue, None)
@@ -203,6 +222,12 @@ filename_res[None] = re.compile(
 )
 
 
+@functools.lru_cache(maxsize=64)
+def _parse_metadata(ans):
+    # The same metadata is queried repeatedly, e.g. for the tracks in the queue
+    return tuple(metadata_re.findall(ans))
+
+
 def _extract_id(filename, playlist=None):
     return re.findall(filename_res[playlist], filename)[0]
 
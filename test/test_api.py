@@ -9,15 +9,49 @@ from unittest import mock
 
 from werkzeug.test import Client
 
+from .utils import TEMP_DIR
+
+# Any valid file id will do, the handlers do not look it up
+FILE_ID = "5f4b9c32-1a4e-4c1b-9a3d-6e2f0d8c7b15"
+
+# HTTP method, URL and the accepted status codes
+URL_CASES = (
+    ("get", "/", (200,)),
+    ("get", "/playlist/music/", (405,)),
+    ("get", "/playlist/jingles/", (405,)),
+    ("get", "/playlist/nonexistant/", (404,)),
+    ("get", "/öäü/", (404,)),
+    ("post", "/playlist/jingles", (301, 308)),
+    ("post", "/playlist/music/", (422,)),
+    ("post", "/playlist/jingles/something", (404,)),
+    ("put", "/playlist/music/", (405,)),
+    ("put", "/playlist/jingles/something", (404,)),
+    ("put", "/playlist/jingles/something.mp3", (404,)),
+    ("put", "/playlist/music/" + FILE_ID, (404,)),
+    ("put", "/playlist/music/" + FILE_ID + ".mp3", (415,)),
+    ("put", "/playlist/classics/" + FILE_ID + ".mp3", (415,)),
+    ("put", "/playlist/jingles/" + FILE_ID + ".mp3", (415,)),
+    ("put", "/playlist/jingles/" + FILE_ID + ".ttt", (404,)),
+    ("delete", "/playlist/music/", (405,)),
+    ("delete", "/playlist/jingles/something", (404,)),
+    ("delete", "/playlist/jingles/something.mp3", (404,)),
+    ("delete", "/playlist/music/" + FILE_ID, (404,)),
+    ("delete", "/playlist/music/" + FILE_ID + ".mp3", (200,)),
+    ("delete", "/playlist/classics/" + FILE_ID + ".mp3", (200,)),
+    ("delete", "/playlist/jingles/" + FILE_ID + ".mp3", (200,)),
+    ("delete", "/playlist/music/" + FILE_ID + ".ttt", (404,)),
+)
+
 
 class GenericAPITestCase(unittest.TestCase):
+    @classmethod
     @mock.patch(
         "klangbecken.api.JWTAuthorizationMiddleware", lambda app, *args, **kwargs: app
     )
-    def setUp(self):
+    def setUpClass(cls):
         from klangbecken.api import klangbecken_api
 
-        self.app = klangbecken_api(
+        cls.app = klangbecken_api(
             "very secret",
             "data_dir",
             "player.sock",
@@ -25,67 +59,27 @@ class GenericAPITestCase(unittest.TestCase):
             update_analyzers=[],
             processors=[],
         )
+
+    def setUp(self):
         self.client = Client(self.app)
 
     def test_application(self):
         self.assertTrue(callable(self.app))
 
     def testUrls(self):
-        resp = self.client.get("/")
-        self.assertEqual(resp.status_code, 200)
-        resp = self.client.get("/playlist/music/")
-        self.assertEqual(resp.status_code, 405)
-        resp = self.client.get("/playlist/jingles/")
-        self.assertEqual(resp.status_code, 405)
-        resp = self.client.get("/playlist/nonexistant/")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.get("/öäü/")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.post("/playlist/jingles")
-        self.assertIn(resp.status_code, (301, 308))
-        resp = self.client.post("/playlist/music/")
-        self.assertEqual(resp.status_code, 422)
-        resp = self.client.post("/playlist/jingles/something")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.put("/playlist/music/")
-        self.assertEqual(resp.status_code, 405)
-        resp = self.client.put("/playlist/jingles/something")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.put("/playlist/jingles/something.mp3")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.put("/playlist/music/" + str(uuid.uuid4()))
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.put("/playlist/music/" + str(uuid.uuid4()) + ".mp3")
-        self.assertEqual(resp.status_code, 415)
-        resp = self.client.put("/playlist/classics/" + str(uuid.uuid4()) + ".mp3")
-        self.assertEqual(resp.status_code, 415)
-        resp = self.client.put("/playlist/jingles/" + str(uuid.uuid4()) + ".mp3")
-        self.assertEqual(resp.status_code, 415)
-        resp = self.client.put("/playlist/jingles/" + str(uuid.uuid4()) + ".ttt")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.delete("/playlist/music/")
-        self.assertEqual(resp.status_code, 405)
-        resp = self.client.delete("/playlist/jingles/something")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.delete("/playlist/jingles/something.mp3")
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.delete("/playlist/music/" + str(uuid.uuid4()))
-        self.assertEqual(resp.status_code, 404)
-        resp = self.client.delete("/playlist/music/" + str(uuid.uuid4()) + ".mp3")
-        self.assertEqual(resp.status_code, 200)
-        resp = self.client.delete("/playlist/classics/" + str(uuid.uuid4()) + ".mp3")
-        self.assertEqual(resp.status_code, 200)
-        resp = self.client.delete("/playlist/jingles/" + str(uuid.uuid4()) + ".mp3")
-        self.assertEqual(resp.status_code, 200)
-        resp = self.client.delete("/playlist/music/" + str(uuid.uuid4()) + ".ttt")
-        self.assertEqual(resp.status_code, 404)
+        for method, url, status_codes in URL_CASES:
+            with self.subTest(method=method, url=url):
+                resp = getattr(self.client, method)(url)
+                self.assertIn(resp.status_code, status_codes)
+
         resp = self.client.get("/player/")
         self.assertEqual(resp.status_code, 404)
         self.assertIn(b"Player not running", resp.data)
 
 
 class AuthTestCase(unittest.TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         from klangbecken.api import klangbecken_api
 
         with mock.patch(
@@ -95,19 +89,22 @@ class AuthTestCase(unittest.TestCase):
         ), mock.patch(
             "klangbecken.api.DEFAULT_PROCESSORS", [lambda *args: None]
         ):
-            app = klangbecken_api(
+            cls.app = klangbecken_api(
                 "very secret",
                 "inexistent_dir",
                 "nix.sock",
             )
-        self.client = Client(app)
+
+    def setUp(self):
+        # Fresh client for every test, to not share cookies
+        self.client = Client(self.app)
 
     def testFailingAuth(self):
         resp = self.client.post("/playlist/music/")
         self.assertEqual(resp.status_code, 401)
-        resp = self.client.put("/playlist/jingles/" + str(uuid.uuid4()) + ".mp3")
+        resp = self.client.put("/playlist/jingles/" + FILE_ID + ".mp3")
         self.assertEqual(resp.status_code, 401)
-        resp = self.client.delete("/playlist/music/" + str(uuid.uuid4()) + ".ogg")
+        resp = self.client.delete("/playlist/music/" + FILE_ID + ".ogg")
         self.assertEqual(resp.status_code, 401)
 
     def testFailingLogin(self):
@@ -128,31 +125,38 @@ class AuthTestCase(unittest.TestCase):
 
 
 class PlaylistAPITestCase(unittest.TestCase):
+    @classmethod
     @mock.patch(
         "klangbecken.api.JWTAuthorizationMiddleware", lambda app, *args, **kwargs: app
     )
-    def setUp(self):
+    def setUpClass(cls):
         from klangbecken.api import klangbecken_api
         from klangbecken.playlist import FileAddition, MetadataChange
 
-        self.upload_analyzer = mock.Mock(
+        # The app is stateless, thus build it once and only reset the mocks
+        cls.upload_analyzer = mock.Mock(
             return_value=[
                 FileAddition("testfile"),
                 MetadataChange("testkey", "testvalue"),
             ]
         )
-        self.update_analyzer = mock.Mock(return_value=["UpdateChange"])
-        self.processor = mock.MagicMock()
+        cls.update_analyzer = mock.Mock(return_value=["UpdateChange"])
+        cls.processor = mock.MagicMock()
 
         app = klangbecken_api(
             "very secret",
             "data_dir",
             "player.sock",
-            upload_analyzers=[self.upload_analyzer],
-            update_analyzers=[self.update_analyzer],
-            processors=[self.processor],
+            upload_analyzers=[cls.upload_analyzer],
+            update_analyzers=[cls.update_analyzer],
+            processors=[cls.processor],
         )
-        self.client = Client(app)
+        cls.client = Client(app)
+
+    def setUp(self):
+        self.upload_analyzer.reset_mock()
+        self.update_analyzer.reset_mock()
+        self.processor.reset_mock()
 
     @mock.patch("werkzeug.datastructures.FileStorage.save", lambda *args: None)
     @mock.patch("os.remove", lambda fname: None)
@@ -177,7 +181,7 @@ class PlaylistAPITestCase(unittest.TestCase):
         self.assertEqual(args[0], "music")
         self.assertEqual(args[1], fileId)
         self.assertEqual(args[2], "mp3")
-        self.assertTrue(isinstance(args[3], str))
+        self.assertIsInstance(args[3], str)
         self.assertTrue(args[3].startswith("data_dir/upload/"))
 
         self.processor.assert_called_once_with(
@@ -193,9 +197,6 @@ class PlaylistAPITestCase(unittest.TestCase):
             ],
         )
 
-        self.upload_analyzer.reset_mock()
-        self.processor.reset_mock()
-
     def testUpdate(self):
         # Update weight correctly
         fileId = str(uuid.uuid4())
@@ -260,8 +261,6 @@ class PlaylistAPITestCase(unittest.TestCase):
         self.processor.assert_called_once_with(
             "data_dir", "music", fileId, "mp3", [FileDeletion()]
         )
-        self.upload_analyzer.reset_mock()
-        self.processor.reset_mock()
 
 
 class PlayerAPITestCase(unittest.TestCase):
@@ -273,7 +272,7 @@ class PlayerAPITestCase(unittest.TestCase):
         self.liquidsoap_client.__enter__ = mock.Mock(
             return_value=self.liquidsoap_client
         )
-        self.tempdir = tempfile.mkdtemp()
+        self.tempdir = tempfile.mkdtemp(dir=TEMP_DIR)
         app = player_api("inexistent.sock", self.tempdir)
         os.mkdir(os.path.join(self.tempdir, "music"))
         with open(os.path.join(self.tempdir, "music", "titi.mp3"), "w"):
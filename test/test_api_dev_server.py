@@ -7,13 +7,13 @@ import uuid
 
 from werkzeug.test import Client
 
-from .utils import capture
+from .utils import TEMP_DIR, capture
 
 
 class DevServerStartupTestCase(unittest.TestCase):
     def setUp(self):
         self.current_path = os.path.dirname(os.path.realpath(__file__))
-        self.tempdir = tempfile.mkdtemp()
+        self.tempdir = tempfile.mkdtemp(dir=TEMP_DIR)
 
     def tearDown(self):
         shutil.rmtree(self.tempdir)
@@ -57,7 +57,7 @@ class DevServerTestCase(unittest.TestCase):
         from klangbecken.cli import init_cmd
 
         self.current_path = os.path.dirname(os.path.realpath(__file__))
-        self.tempdir = tempfile.mkdtemp()
+        self.tempdir = tempfile.mkdtemp(dir=TEMP_DIR)
         init_cmd(self.tempdir)
         app = development_server(self.tempdir, "very secret")
         self.client = Client(app)
@@ -71,7 +71,7 @@ class DevServerTestCase(unittest.TestCase):
         self.assertEqual(resp.status_code, 200)
         data = json.loads(resp.data)
         self.assertIn("token", data)
-        token = data["token"]
+        headers = [("Authorization", f"Bearer {data['token']}")]
         resp.close()
 
         # Upload
@@ -80,7 +80,7 @@ class DevServerTestCase(unittest.TestCase):
             resp = self.client.post(
                 "/api/playlist/jingles/",
                 data={"file": (f, "sine-unicode-jointstereo.mp3")},
-                headers=[("Authorization", f"Bearer {token}")],
+                headers=headers,
             )
         self.assertEqual(resp.status_code, 200)
         data = json.loads(resp.data)
@@ -104,7 +104,7 @@ class DevServerTestCase(unittest.TestCase):
             resp = self.client.post(
                 "/api/playlist/jingles/",
                 data={"file": (f, "not-an-audio-file.mp3")},
-                headers=[("Authorization", f"Bearer {token}")],
+                headers=headers,
             )
         self.assertEqual(resp.status_code, 422)
         data = json.loads(resp.data)
@@ -116,7 +116,7 @@ class DevServerTestCase(unittest.TestCase):
             "/api/playlist/jingles/" + fileId + ".mp3",
             data=json.dumps({"weight": 4}),
             content_type="text/json",
-            headers=[("Authorization", f"Bearer {token}")],
+            headers=headers,
         )
         self.assertEqual(resp.status_code, 200)
         resp.close()
@@ -134,7 +134,7 @@ class DevServerTestCase(unittest.TestCase):
         # Delete file
         resp = self.client.delete(
             "/api/playlist/jingles/" + fileId + ".mp3",
-            headers=[("Authorization", f"Bearer {token}")],
+            headers=headers,
         )
         self.assertEqual(resp.status_code, 200)
         resp.close()
@@ -5,8 +5,9 @@ import shutil
 import sys
 import tempfile
 import unittest
+from unittest import mock
 
-from .utils import capture
+from .utils import TEMP_DIR, capture
 
 
 class DisableExpiredTestCase(unittest.TestCase):
@@ -14,7 +15,7 @@ class DisableExpiredTestCase(unittest.TestCase):
         from klangbecken.cli import _check_data_dir, import_cmd
 
         self.current_path = os.path.dirname(os.path.realpath(__file__))
-        self.tempdir = tempfile.mkdtemp()
+        self.tempdir = tempfile.mkdtemp(dir=TEMP_DIR)
         self.jingles_dir = os.path.join(self.tempdir, "jingles")
         self.jingles_playlist = os.path.join(self.tempdir, "jingles.m3u")
         self.index = os.path.join(self.tempdir, "index.json")
@@ -44,15 +45,12 @@ class DisableExpiredTestCase(unittest.TestCase):
         track1, track2, track3 = os.listdir(self.jingles_dir)
 
         # "empty" run
-        argv, sys.argv = sys.argv, ["", "disable-expired", "-d", self.tempdir]
-        try:
+        with mock.patch("sys.argv", ["", "disable-expired", "-d", self.tempdir]):
             with capture(main) as (out, err, ret):
                 self.assertEqual(err.strip(), "")
-        finally:
-            sys.arv = argv
 
         with open(self.jingles_playlist) as f:
-            lines = f.readlines()
+            lines = f.read().splitlines()
         self.assertEqual(len(lines), 3)
 
         # modify expiration dates
@@ -78,19 +76,16 @@ class DisableExpiredTestCase(unittest.TestCase):
             self.assertEqual(entry["weight"], 1)
 
         # run for real
-        argv, sys.argv = sys.argv, ["", "disable-expired", "-d", self.tempdir]
-        try:
+        with mock.patch("sys.argv", ["", "disable-expired", "-d", self.tempdir]):
             with capture(main) as (out, err, ret):
                 pass
-        finally:
-            sys.arv = argv
 
         self.assertEqual(err.strip(), "")
         self.assertIn(track1, out)
         self.assertNotIn(track2, out)
         self.assertNotIn(track3, out)
         with open(self.jingles_playlist) as f:
-            lines = [line.strip() for line in f.readlines()]
+            lines = f.read().splitlines()
         self.assertEqual(len(lines), 2)
         for line in lines:
             self.assertNotIn(track1, line)
@@ -109,12 +104,9 @@ class DisableExpiredTestCase(unittest.TestCase):
                 self.assertEqual(entry["weight"], 1)
 
         # run again for real, nothing should happen now
-        argv, sys.argv = sys.argv, ["", "disable-expired", "-d", self.tempdir]
-        try:
+        with mock.patch("sys.argv", ["", "disable-expired", "-d", self.tempdir]):
             with capture(main) as (out, err, ret):
                 pass
-        finally:
-            sys.arv = argv
 
         self.assertEqual(err.strip(), "")
         self.assertEqual(out.strip(), "")
@@ -4,26 +4,30 @@ import shutil
 import sys
 import tempfile
 import unittest
+from unittest import mock
 
-from .utils import capture
+from klangbecken.cli import _check_data_dir, import_cmd, main, playlog_cmd
+from klangbecken.settings import FILE_TYPES
 
+from .utils import TEMP_DIR, capture
 
-class FsckTestCase(unittest.TestCase):
-    def setUp(self):
-        from klangbecken.cli import _check_data_dir, import_cmd
 
-        self.current_path = os.path.dirname(os.path.realpath(__file__))
-        self.tempdir = tempfile.mkdtemp()
-        self.jingles_dir = os.path.join(self.tempdir, "jingles")
-        _check_data_dir(self.tempdir, create=True)
+class FsckTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Import the files once, and copy the data directory for every test
+        cls.basedir = tempfile.TemporaryDirectory(dir=TEMP_DIR)
+        cls.template = os.path.join(cls.basedir.name, "template")
+        _check_data_dir(cls.template, create=True)
 
         # Correctly import a couple of files
+        current_path = os.path.dirname(os.path.realpath(__file__))
         files = [
-            os.path.join(self.current_path, "audio", "padded-" + spec + ".mp3")
+            os.path.join(current_path, "audio", "padded-" + spec + ".mp3")
             for spec in "stereo jointstereo start-stereo end-stereo".split()
         ]
         try:
-            args = [self.tempdir, "jingles", files, True]
+            args = [cls.template, "jingles", files, True]
             with capture(import_cmd, *args) as (out, err, ret):
                 pass
         except SystemExit as e:
@@ -31,104 +35,92 @@ class FsckTestCase(unittest.TestCase):
                 print(e, file=sys.stderr)
                 raise (RuntimeError("Command execution failed"))
 
+    @classmethod
+    def tearDownClass(cls):
+        cls.basedir.cleanup()
+
+    def setUp(self):
+        self.tempdir = os.path.join(self.basedir.name, self.id())
+        shutil.copytree(self.template, self.tempdir)
+        self.jingles_dir = os.path.join(self.tempdir, "jingles")
+        self.index_path = os.path.join(self.tempdir, "index.json")
+        self.playlist_path = os.path.join(self.tempdir, "jingles.m3u")
+
     def tearDown(self):
         shutil.rmtree(self.tempdir)
 
-    def testFsckCorruptIndexJson(self):
-        from klangbecken.cli import main
+    def _resetDataDir(self):
+        shutil.rmtree(self.tempdir)
+        shutil.copytree(self.template, self.tempdir)
+
+    def _readIndex(self):
+        with open(self.index_path) as f:
+            return json.load(f)
 
-        index_path = os.path.join(self.tempdir, "index.json")
-        with open(index_path, "w"):
+    def _writeIndex(self, data):
+        with open(self.index_path, "w") as f:
+            json.dump(data, f)
+
+    def testFsckCorruptIndexJson(self):
+        with open(self.index_path, "w"):
             pass
 
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertIn("ERROR", err)
             self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
 
     def testFsckCorruptDataDir(self):
-        from klangbecken.cli import main
-
         shutil.rmtree(self.jingles_dir)
 
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertIn("ERROR", err)
             self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
 
     def testFsckInexistentDataDir(self):
-        from klangbecken.cli import main
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", "invalid"]
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", "invalid"]):
             # inexistent data_dir
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertIn("ERROR", err)
                     self.assertIn("Data directory 'invalid' does not exist", err)
             self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
 
     def testFsck(self):
-        from klangbecken.cli import main
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
             # correct invocation
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertEqual(err.strip(), "")
             self.assertEqual(cm.exception.code, 0)
-        finally:
-            sys.arv = argv
 
     def testFsckWithInterleavingPlaylogs(self):
-        from klangbecken.cli import main, playlog_cmd
-
         # log one one track play
         track1 = os.listdir(self.jingles_dir)[0]
         track2 = os.listdir(self.jingles_dir)[1]
         playlog_cmd(self.tempdir, os.path.join("jingles", track1))
 
         # back up index.json cache
-        shutil.copy(
-            os.path.join(self.tempdir, "index.json"),
-            os.path.join(self.tempdir, "index.json.bak"),
-        )
+        shutil.copy(self.index_path, self.index_path + ".bak")
 
         # log two mor track plays
         playlog_cmd(self.tempdir, os.path.join("jingles", track1))
         playlog_cmd(self.tempdir, os.path.join("jingles", track2))
 
         # restore index.json cache
-        shutil.copy(
-            os.path.join(self.tempdir, "index.json.bak"),
-            os.path.join(self.tempdir, "index.json"),
-        )
+        shutil.copy(self.index_path + ".bak", self.index_path)
 
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
             # correct invocation (should not raise error)
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertEqual(err.strip(), "")
             self.assertEqual(cm.exception.code, 0)
-        finally:
-            sys.arv = argv
 
     def testFsckWithTooManyInterleavingPlaylogs(self):
-        from klangbecken.cli import main, playlog_cmd
-
         # log one one track play
         track1 = os.listdir(self.jingles_dir)[0]
         track2 = os.listdir(self.jingles_dir)[1]
@@ -138,10 +130,7 @@ class FsckTestCase(unittest.TestCase):
         playlog_cmd(self.tempdir, os.path.join("jingles", track1))
 
         # back up index.json cache
-        shutil.copy(
-            os.path.join(self.tempdir, "index.json"),
-            os.path.join(self.tempdir, "index.json.bak"),
-        )
+        shutil.copy(self.index_path, self.index_path + ".bak")
 
         # log two mor track plays
         playlog_cmd(self.tempdir, os.path.join("jingles", track1))
@@ -150,184 +139,104 @@ class FsckTestCase(unittest.TestCase):
         playlog_cmd(self.tempdir, os.path.join("jingles", track4))
 
         # restore index.json cache
-        shutil.copy(
-            os.path.join(self.tempdir, "index.json.bak"),
-            os.path.join(self.tempdir, "index.json"),
-        )
+        shutil.copy(self.index_path + ".bak", self.index_path)
 
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertIn("ERROR", err)
                     self.assertIn("last_play", err)
             self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
-
-    def testIndexWithWrongId(self):
-        from klangbecken.cli import main
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
-        index_path = os.path.join(self.tempdir, "index.json")
-        with open(index_path) as f:
-            data = json.load(f)
-
-        entry1, entry2 = list(data.values())[:2]
-        entry1["id"], entry2["id"] = entry2["id"], entry1["id"]
-        with open(index_path, "w") as f:
-            json.dump(data, f)
-
-        try:
-            with self.assertRaises(SystemExit) as cm:
-                with capture(main) as (out, err, ret):
-                    self.assertIn("ERROR", err)
-                    self.assertIn("Id mismatch", err)
-            self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
-
-    def testIndexMissingEntries(self):
-        from klangbecken.cli import main
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
-        index_path = os.path.join(self.tempdir, "index.json")
-        with open(index_path) as f:
-            data = json.load(f)
-
-        entry = next(iter(data.values()))
-        del entry["cue_out"]
-
-        with open(index_path, "w") as f:
-            json.dump(data, f)
-
-        try:
-            with self.assertRaises(SystemExit) as cm:
-                with capture(main) as (out, err, ret):
-                    self.assertIn("ERROR", err)
-                    self.assertIn("missing entries: cue_out", err)
-            self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
 
-    def testIndexTooManyEntries(self):
-        from klangbecken.cli import main
+    def testIndexCorruption(self):
+        def swap_ids(data):
+            entry1, entry2 = list(data.values())[:2]
+            entry1["id"], entry2["id"] = entry2["id"], entry1["id"]
 
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
+        def remove_cue_out(data):
+            entry = next(iter(data.values()))
+            del entry["cue_out"]
 
-        index_path = os.path.join(self.tempdir, "index.json")
-        with open(index_path) as f:
-            data = json.load(f)
+        def add_entry(data):
+            entry = next(iter(data.values()))
+            entry["whatever"] = "whatever"
 
-        entry = next(iter(data.values()))
-        entry["whatever"] = "whatever"
+        test_data = [
+            (swap_ids, "Id mismatch"),
+            (remove_cue_out, "missing entries: cue_out"),
+            (add_entry, "too many entries: whatever"),
+        ]
 
-        with open(index_path, "w") as f:
-            json.dump(data, f)
+        for corrupt, message in test_data:
+            with self.subTest(message):
+                self._resetDataDir()
+                data = self._readIndex()
+                corrupt(data)
+                self._writeIndex(data)
 
-        try:
-            with self.assertRaises(SystemExit) as cm:
-                with capture(main) as (out, err, ret):
-                    self.assertIn("ERROR", err)
-                    self.assertIn("too many entries: whatever", err)
-            self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
+                with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
+                    with self.assertRaises(SystemExit) as cm:
+                        with capture(main) as (out, err, ret):
+                            self.assertIn("ERROR", err)
+                            self.assertIn(message, err)
+                    self.assertEqual(cm.exception.code, 1)
 
     def testIndexMissingFile(self):
-        from klangbecken.cli import main
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
         os.remove(os.path.join(self.jingles_dir, os.listdir(self.jingles_dir)[0]))
 
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertIn("ERROR", err)
                     self.assertIn("file does not exist", err)
             self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
 
     def testTagsValueMismatch(self):
-        from klangbecken.cli import main
-        from klangbecken.settings import FILE_TYPES
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
         file_path = os.path.join(self.jingles_dir, os.listdir(self.jingles_dir)[0])
         FileType = FILE_TYPES[file_path.split(".")[-1]]
         mutagenfile = FileType(file_path)
         mutagenfile["artist"] = "Whatever"
         mutagenfile.save()
 
-        try:
+        with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
             with self.assertRaises(SystemExit) as cm:
                 with capture(main) as (out, err, ret):
                     self.assertIn("ERROR", err)
                     self.assertIn("tag value mismatch", err)
                     self.assertIn("artist", err)
             self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
-
-    def testPlaylistWeightMismatch(self):
-        from klangbecken.cli import main
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
-        playlist_path = os.path.join(self.tempdir, "jingles.m3u")
-        with open(playlist_path) as f:
-            lines = f.readlines()
-        with open(playlist_path, "w") as f:
-            f.writelines(lines[::2])  # only write back every second line
-
-        try:
-            with self.assertRaises(SystemExit) as cm:
-                with capture(main) as (out, err, ret):
-                    self.assertIn("ERROR", err)
-                    self.assertIn("Playlist weight mismatch", err)
-            self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
 
-    def testDanglingPlaylistEntries(self):
-        from klangbecken.cli import main
-
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
-
-        playlist_path = os.path.join(self.tempdir, "jingles.m3u")
-        with open(playlist_path, "a") as f:
-            f.write("jingles/not_an_uuid.mp3\n")
-
-        try:
-            with self.assertRaises(SystemExit) as cm:
-                with capture(main) as (out, err, ret):
-                    self.assertIn("ERROR", err)
-                    self.assertIn("Dangling playlist entries", err)
-                    self.assertIn("not_an_uuid", err)
-            self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
+    def testPlaylistAndFileCorruption(self):
+        def halve_playlist():
+            with open(self.playlist_path, "rb+") as f:
+                lines = f.read().splitlines(keepends=True)
+                f.seek(0)
+                f.write(b"".join(lines[::2]))  # only write back every second line
+                f.truncate()
 
-    def testDanglingFiles(self):
-        from klangbecken.cli import main
+        def add_dangling_playlist_entry():
+            with open(self.playlist_path, "a") as f:
+                f.write("jingles/not_an_uuid.mp3\n")
 
-        argv, sys.argv = sys.argv, ["", "fsck", "-d", self.tempdir]
+        def add_dangling_file():
+            with open(os.path.join(self.jingles_dir, "not_an_uuid"), "w"):
+                pass
 
-        with open(os.path.join(self.tempdir, "jingles", "not_an_uuid"), "w"):
-            pass
+        test_data = [
+            (halve_playlist, ["Playlist weight mismatch"]),
+            (add_dangling_playlist_entry, ["Dangling playlist entries", "not_an_uuid"]),
+            (add_dangling_file, ["Dangling files", "not_an_uuid"]),
+        ]
 
-        try:
-            with self.assertRaises(SystemExit) as cm:
-                with capture(main) as (out, err, ret):
-                    self.assertIn("ERROR", err)
-                    self.assertIn("Dangling files", err)
-                    self.assertIn("not_an_uuid", err)
-            self.assertEqual(cm.exception.code, 1)
-        finally:
-            sys.arv = argv
+        for corrupt, messages in test_data:
+            with self.subTest(corrupt.__name__):
+                self._resetDataDir()
+                corrupt()
+
+                with mock.patch("sys.argv", ["", "fsck", "-d", self.tempdir]):
+                    with self.assertRaises(SystemExit) as cm:
+                        with capture(main) as (out, err, ret):
+                            self.assertIn("ERROR", err)
+                            for message in messages:
+                                self.assertIn(message, err)
+                    self.assertEqual(cm.exception.code, 1)
@@ -8,7 +8,7 @@ from unittest import mock
 
 import mutagen
 
-from .utils import capture
+from .utils import TEMP_DIR, capture
 
 
 class ImporterTestCase(unittest.TestCase):
@@ -16,7 +16,7 @@ class ImporterTestCase(unittest.TestCase):
         from klangbecken.cli import _check_data_dir
 
         self.current_path = os.path.dirname(os.path.realpath(__file__))
-        self.tempdir = tempfile.mkdtemp()
+        self.tempdir = tempfile.mkdtemp(dir=TEMP_DIR)
         # self.music_dir = os.path.join(self.tempdir, "music")
         self.jingles_dir = os.path.join(self.tempdir, "jingles")
         _check_data_dir(self.tempdir, create=True)
@@ -62,9 +62,7 @@ class ImporterTestCase(unittest.TestCase):
         self.assertEqual(cm.exception.code, 0)
 
         files = [
-            f
-            for f in os.listdir(self.jingles_dir)
-            if os.path.isfile(os.path.join(self.jingles_dir, f))
+            entry.name for entry in os.scandir(self.jingles_dir) if entry.is_file()
         ]
         self.assertEqual(len(files), 1)
         with open(os.path.join(self.tempdir, "index.json")) as file:
@@ -98,9 +96,7 @@ class ImporterTestCase(unittest.TestCase):
         self.assertEqual(cm.exception.code, 0)
 
         files = [
-            f
-            for f in os.listdir(self.jingles_dir)
-            if os.path.isfile(os.path.join(self.jingles_dir, f))
+            entry.name for entry in os.scandir(self.jingles_dir) if entry.is_file()
         ]
         self.assertEqual(len(files), 1)
         with open(os.path.join(self.tempdir, "index.json")) as file:
@@ -5,12 +5,12 @@ import tempfile
 import unittest
 from unittest import mock
 
-from .utils import capture
+from .utils import TEMP_DIR, capture
 
 
 class InitCmdTestCase(unittest.TestCase):
     def setUp(self):
-        self.tempdir = tempfile.mkdtemp()
+        self.tempdir = tempfile.mkdtemp(dir=TEMP_DIR)
 
     def tearDown(self):
         shutil.rmtree(self.tempdir)
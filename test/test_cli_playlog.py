@@ -18,6 +18,8 @@ class PlaylogCmdTestCase(unittest.TestCase):
         from klangbecken.cli import _check_data_dir, import_cmd
 
         self.current_path = os.path.dirname(os.path.realpath(__file__))
+        # The playlog script is executed, thus don't put it on a possibly
+        # noexec mounted TEMP_DIR
         self.data_dir = tempfile.mkdtemp()
         _check_data_dir(self.data_dir, create=True)
 
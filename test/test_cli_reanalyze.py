@@ -8,7 +8,7 @@ from unittest import mock
 
 from mutagen import File
 
-from .utils import capture
+from .utils import TEMP_DIR, capture
 
 
 class ReanalyzeCmdTestCase(unittest.TestCase):
@@ -16,7 +16,7 @@ class ReanalyzeCmdTestCase(unittest.TestCase):
         from klangbecken.cli import _check_data_dir, import_cmd
 
         self.current_path = os.path.dirname(os.path.realpath(__file__))
-        self.data_dir = tempfile.mkdtemp()
+        self.data_dir = tempfile.mkdtemp(dir=TEMP_DIR)
         _check_data_dir(self.data_dir, create=True)
 
         # Correctly import a couple of files
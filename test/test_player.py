@@ -1,8 +1,7 @@
+import asyncio
+import contextlib
 import os
-import random
 import shutil
-import socket
-import socketserver
 import sys
 import tempfile
 import threading
@@ -11,95 +10,238 @@ from unittest import mock
 
 from werkzeug.exceptions import NotFound
 
-
-class EchoHandler(socketserver.BaseRequestHandler):
-    def handle(self):
-        while True:
-            msg = self.request.recv(8192)
-            if not msg or msg.strip() == b"exit":
-                self.request.send(b"Bye!\n")
-                break
-            self.request.send(msg)
-
-
-def get_port():
+from klangbecken import __version__
+from klangbecken.player import LiquidsoapClient, _parse_metadata
+
+from .utils import TEMP_DIR, capture
+
+MUSIC_ID = "2e3fc9b6-36ee-4640-9efd-cdf10560adb4"
+MUSIC_PATH = f"data/music/{MUSIC_ID}.mp3"
+CLASSICS_ID = "4daabe44-6d48-47c4-a187-592cf048b039"
+CLASSICS_PATH = f"data/classics/{CLASSICS_ID}.mp3"
+
+ON_AIR_METADATA = f'''playlist_position="1"
+rid="8"
+source="classics"
+temporary="false"
+filename="{CLASSICS_PATH}"'''
+
+PRIMARY_QUEUE_METADATA = f'''queue="primary"
+rid="0"
+status="ready"
+source="queue"
+temporary="false"
+filename="{CLASSICS_PATH}"'''
+
+SECONDARY_QUEUE_METADATA = f'''queue="secondary"
+rid="1"
+status="ready"
+source="queue"
+temporary="false"
+filename="{CLASSICS_PATH}"'''
+
+STATUS_CALLS = (
+    ("uptime", "0d 00h 08m 54s"),
+    ("version", "Liquidsoap 1.4.2"),
+)
+
+ON_AIR_CALLS = (
+    STATUS_CALLS
+    + (("klangbecken.on_air", "true"), ("queue.queue", "0 1"))
+    + (
+        ("music.next", f"[ready] {MUSIC_PATH}"),
+        ("classics.next", f"[playing] {CLASSICS_PATH}"),
+        ("jingles.next", ""),
+    )
+)
+
+OFF_AIR_CALLS = STATUS_CALLS + (
+    ("klangbecken.on_air", "false"),
+    ("queue.queue", "0 1"),
+)
+
+QUEUE_METADATA_CALLS = (
+    ("request.metadata 0", PRIMARY_QUEUE_METADATA),
+    ("request.metadata 1", SECONDARY_QUEUE_METADATA),
+)
+
+QUEUE_CALLS = (("queue.queue", "0 1"),) + QUEUE_METADATA_CALLS
+
+PUSH_CALLS = (
+    (f"queue.push {CLASSICS_PATH}", "1"),
+    (
+        "request.metadata 1",
+        f'''queue="primary"
+rid="1"
+status="ready"
+source="queue"
+temporary="false"
+filename="{CLASSICS_PATH}"''',
+    ),
+)
+
+DELETE_CALLS = (
+    ("queue.secondary_queue", "2 4"),
+    ("queue.remove 2", "OK"),
+    (
+        "request.metadata 2",
+        f'''queue="secondary"
+rid="2"
+status="destroyed"
+source="queue"
+temporary="false"
+filename="{CLASSICS_PATH}"''',
+    ),
+)
+
+ON_AIR_INFO = {
+    "uptime": "0d 00h 08m 54s",
+    "liquidsoap_version": "Liquidsoap 1.4.2",
+    "api_version": __version__,
+    "python_version": sys.version.split()[0],
+    "music": MUSIC_ID,
+    "classics": "",
+    "jingles": "",
+    "on_air": True,
+    "current_track": {
+        "source": "classics",
+        "id": CLASSICS_ID,
+    },
+    "queue": CLASSICS_ID,
+}
+
+OFF_AIR_INFO = {
+    "uptime": "0d 00h 08m 54s",
+    "liquidsoap_version": "Liquidsoap 1.4.2",
+    "api_version": __version__,
+    "python_version": sys.version.split()[0],
+    "on_air": False,
+    "music": "",
+    "classics": "",
+    "jingles": "",
+    "queue": CLASSICS_ID,
+}
+
+
+async def echo(reader, writer):
     while True:
-        port = random.randrange(1024, 65535)
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        msg = await reader.read(8192)
+        if not msg:  # Client closed the connection without saying goodbye
+            break
+        if msg.strip() == b"exit":
+            writer.write(b"Bye!\n")
+            break
+        writer.write(msg)
+    writer.close()
+
+
+@contextlib.contextmanager
+def echo_server(addr):
+    """Run an echo server in a background event loop.
+
+    Yields the address the server is listening on. TCP servers should be
+    started on port 0, to let the operating system pick a free port.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    if isinstance(addr, str):
+        start = asyncio.start_unix_server(echo, addr)
+    else:
+        start = asyncio.start_server(echo, *addr)
+    try:
+        server = asyncio.run_coroutine_threadsafe(start, loop).result()
         try:
-            sock.bind(("localhost", port))
-            sock.close()
-            return port
-        except OSError:
-            pass
-
-
-class LiquidsoapClientTestCase(unittest.TestCase):
-    def setUp(self):
-        self.tempdir = tempfile.mkdtemp()
-
-    def tearDown(self):
-        shutil.rmtree(self.tempdir)
+            addr = server.sockets[0].getsockname()
+            yield addr[:2] if isinstance(addr, tuple) else addr
+        finally:
+            loop.call_soon_threadsafe(server.close)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+class FakeConnection:
+    """Connection replaying canned responses and recording sent commands."""
+
+    def __init__(self, command_calls):
+        self.responses = iter([resp for _, resp in command_calls])
+        self.commands = []
+
+    def write(self, data):
+        self.commands.extend(data.decode("ascii").split("\r\n")[:-1])
+
+    def read_until(self, expected):
+        return next(self.responses).encode("ascii") + expected
+
+
+def mock_client(command_calls):
+    """Create a client answering commands with the given canned responses."""
+    client = LiquidsoapClient()
+    client.conn = FakeConnection(command_calls)
+    return client
+
+
+class LiquidsoapConnectionTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # One TCP and one UNIX domain socket echo server for all tests
+        with contextlib.ExitStack() as stack:
+            tempdir = tempfile.mkdtemp(dir=TEMP_DIR)
+            stack.callback(shutil.rmtree, tempdir)
+            cls.tcp_addr = stack.enter_context(echo_server(("localhost", 0)))
+            cls.unix_addr = stack.enter_context(
+                echo_server(os.path.join(tempdir, "test.sock"))
+            )
+            cls.servers = stack.pop_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servers.close()
 
     def testOpenAndUnix(self):
-        from klangbecken.player import LiquidsoapClient
-
-        settings = [
-            (socketserver.TCPServer, ("localhost", get_port())),
-            (socketserver.UnixStreamServer, os.path.join(self.tempdir, "test.sock")),
-        ]
-        for Server, addr in settings:
-            with Server(addr, EchoHandler) as serv:
-                thread = threading.Thread(target=serv.serve_forever)
-                thread.start()
-                client = LiquidsoapClient(addr)
-                with client:
-                    result = client.command("\r\n\r\nhello\r\nworld\r\n\r\nEND")
+        for addr in (self.tcp_addr, self.unix_addr):
+            client = LiquidsoapClient(addr)
+            with client:
+                result = client.command("\r\n\r\nhello\r\nworld\r\n\r\nEND")
                 self.assertEqual(result, "hello\nworld")
-                with client:
-                    with self.assertRaises(Exception) as cm:
-                        client.command("Does not contain the finishing sentinel.")
-                self.assertIn("timed out", cm.exception.args[0])
-                with client:
-                    result = client.command(
-                        "\r\n\r\nThis is the END of the world\r\n\r\nEND"
-                    )
+                result = client.command(
+                    "\r\n\r\nThis is the END of the world\r\n\r\nEND"
+                )
                 self.assertEqual(result, "This is the END of the world")
-                serv.shutdown()
-                thread.join()
+                result = client.commands("\r\nfirst\r\nEND", "second\r\n\r\nEND")
+                self.assertEqual(result, ["first", "second"])
+            # A timed out command leaves unread data behind, thus reconnect
+            with client:
+                with self.assertRaises(Exception) as cm:
+                    client.command("Does not contain the finishing sentinel.")
+            self.assertIn("timed out", cm.exception.args[0])
 
     def testCommandLoggingOnError(self):
-        from klangbecken.player import LiquidsoapClient
+        client = LiquidsoapClient(self.unix_addr)
 
-        from .utils import capture
+        def do():
+            with client:
+                client.command("\r\n\r\nhello\r\nworld\r\n\r\nEND")
+                raise Exception("Something terrible happened")
 
-        Server = socketserver.UnixStreamServer
-        addr = os.path.join(self.tempdir, "test.sock")
-        with Server(addr, EchoHandler) as serv:
-            thread = threading.Thread(target=serv.serve_forever)
-            thread.start()
-            client = LiquidsoapClient(addr)
-
-            def do():
-                with client:
-                    client.command("\r\n\r\nhello\r\nworld\r\n\r\nEND")
-                    raise Exception("Something terrible happened")
+        with self.assertRaises(Exception) as cm:
+            with capture(do) as (out, err, ret):
+                pass
+        self.assertEqual("Something terrible happened", cm.exception.args[0])
+        self.assertIn("Something terrible happened", err)
+        self.assertIn("Command:", err)
+        self.assertIn("Response:", err)
+        self.assertIn("hello", err)
 
-            with self.assertRaises(Exception) as cm:
-                with capture(do) as (out, err, ret):
-                    pass
-            self.assertEqual("Something terrible happened", cm.exception.args[0])
-            self.assertIn("Something terrible happened", err)
-            self.assertIn("Command:", err)
-            self.assertIn("Response:", err)
-            self.assertIn("hello", err)
 
-            serv.shutdown()
-            thread.join()
+class LiquidsoapClientTestCase(unittest.TestCase):
+    def assertCommandsSent(self, client, command_calls):
+        """Assert that exactly the given commands were sent, in order."""
+        self.assertEqual(client.conn.commands, [cmd for cmd, _ in command_calls])
 
     def testMetadata(self):
-        from klangbecken.player import LiquidsoapClient
-
         client = LiquidsoapClient()
         client.command = mock.Mock(
             return_value='rid="15"\ntitle="title"\nartist="artist"'
@@ -109,303 +251,78 @@ class LiquidsoapClientTestCase(unittest.TestCase):
         client.command.assert_called_once_with("request.metadata 15")
         self.assertEqual(result, {"rid": "15", "artist": "artist", "title": "title"})
 
-    def testInfoOnAir(self):
-        from klangbecken import __version__
-        from klangbecken.player import LiquidsoapClient
-
-        command_calls = [
-            ("uptime", "0d 00h 08m 54s"),
-            ("version", "Liquidsoap 1.4.2"),
-            ("klangbecken.on_air", "true"),
-            (
-                "music.next",
-                "[ready] data/music/2e3fc9b6-36ee-4640-9efd-cdf10560adb4.mp3",
-            ),
-            (
-                "classics.next",
-                """[playing] data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3""",
-            ),
-            ("jingles.next", ""),
-            ("request.on_air", "8"),
-            (
-                "request.metadata 8",
-                '''playlist_position="1"
-                rid="8"
-                source="classics"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
-            ),
-            ("queue.queue", "0 1"),
-            (
-                "request.metadata 0",
-                '''queue="primary"
-                rid="0"
-                status="ready"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
-            ),
-        ]
-
-        def side_effect(actual_command):
-            command, result = command_calls.pop(0)
-            self.assertEqual(command, actual_command)
-            return result
-
-        client = LiquidsoapClient()
-        client.command = mock.Mock(side_effect=side_effect)
-
-        result = client.info()
-        self.assertEqual(
-            result,
-            {
-                "uptime": "0d 00h 08m 54s",
-                "liquidsoap_version": "Liquidsoap 1.4.2",
-                "api_version": __version__,
-                "python_version": sys.version.split()[0],
-                "music": "2e3fc9b6-36ee-4640-9efd-cdf10560adb4",
-                "classics": "",
-                "jingles": "",
-                "on_air": True,
-                "current_track": {
-                    "source": "classics",
-                    "id": "4daabe44-6d48-47c4-a187-592cf048b039",
-                },
-                "queue": "4daabe44-6d48-47c4-a187-592cf048b039",
-            },
-        )
-        self.assertEqual(command_calls, [])
-
-    def testInfoOnAirNoCurrentTrack(self):
-        from klangbecken import __version__
-        from klangbecken.player import LiquidsoapClient
-
-        command_calls = [
-            ("uptime", "0d 00h 08m 54s"),
-            ("version", "Liquidsoap 1.4.2"),
-            ("klangbecken.on_air", "true"),
-            (
-                "music.next",
-                "[ready] data/music/2e3fc9b6-36ee-4640-9efd-cdf10560adb4.mp3",
-            ),
-            (
-                "classics.next",
-                "[playing] data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3",
-            ),
-            ("jingles.next", ""),
-            ("request.on_air", ""),
-            ("queue.queue", "0 1"),
-            (
-                "request.metadata 0",
-                '''queue="primary"
-                rid="0"
-                status="ready"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
-            ),
-        ]
-
-        def side_effect(actual_command):
-            command, result = command_calls.pop(0)
-            self.assertEqual(command, actual_command)
-            return result
-
-        client = LiquidsoapClient()
-        client.command = mock.Mock(side_effect=side_effect)
+        # Identical responses are parsed only once
+        hits = _parse_metadata.cache_info().hits
+        result["title"] = "modified"
+        result = client.metadata(15)
+        self.assertEqual(_parse_metadata.cache_info().hits, hits + 1)
+        self.assertEqual(result, {"rid": "15", "artist": "artist", "title": "title"})
 
-        result = client.info()
-        self.assertEqual(
-            result,
-            {
-                "uptime": "0d 00h 08m 54s",
-                "liquidsoap_version": "Liquidsoap 1.4.2",
-                "api_version": __version__,
-                "python_version": sys.version.split()[0],
-                "music": "2e3fc9b6-36ee-4640-9efd-cdf10560adb4",
-                "classics": "",
-                "jingles": "",
-                "on_air": True,
-                "current_track": {},
-                "queue": "4daabe44-6d48-47c4-a187-592cf048b039",
-            },
-        )
-        self.assertEqual(command_calls, [])
-
-    def testInfoOffAir(self):
-        from klangbecken import __version__
-        from klangbecken.player import LiquidsoapClient
-
-        command_calls = [
-            ("uptime", "0d 00h 08m 54s"),
-            ("version", "Liquidsoap 1.4.2"),
-            ("klangbecken.on_air", "false"),
-            ("queue.queue", "0 1"),
-            (
-                "request.metadata 0",
-                '''queue="primary"
-                rid="0"
-                status="ready"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
+    def testInfo(self):
+        # Only the first ready queue entry is queried
+        scenarios = {
+            "on air": (
+                ON_AIR_CALLS
+                + (("request.on_air", "8"), ("request.metadata 8", ON_AIR_METADATA))
+                + QUEUE_METADATA_CALLS[:1],
+                ON_AIR_INFO,
             ),
-            (
-                "request.metadata 1",
-                '''queue="secondary"
-                rid="1"
-                status="ready"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
+            "on air without current track": (
+                ON_AIR_CALLS + (("request.on_air", ""),) + QUEUE_METADATA_CALLS[:1],
+                {**ON_AIR_INFO, "current_track": {}},
             ),
-        ]
+            "off air": (OFF_AIR_CALLS + QUEUE_METADATA_CALLS[:1], OFF_AIR_INFO),
+        }
 
-        def side_effect(actual_command):
-            command, result = command_calls.pop(0)
-            self.assertEqual(command, actual_command)
-            return result
-
-        client = LiquidsoapClient()
-        client.command = mock.Mock(side_effect=side_effect)
-        result = client.info()
-        self.assertEqual(
-            result,
-            {
-                "uptime": "0d 00h 08m 54s",
-                "liquidsoap_version": "Liquidsoap 1.4.2",
-                "api_version": __version__,
-                "python_version": sys.version.split()[0],
-                "on_air": False,
-                "music": "",
-                "classics": "",
-                "jingles": "",
-                "queue": "4daabe44-6d48-47c4-a187-592cf048b039",
-            },
-        )
-        # self.assertEqual(command_calls, [])
+        for scenario, (command_calls, expected) in scenarios.items():
+            with self.subTest(scenario):
+                client = mock_client(command_calls)
+                self.assertEqual(client.info(), expected)
+                self.assertCommandsSent(client, command_calls)
 
     def testQueue(self):
-        from klangbecken.player import LiquidsoapClient
-
-        command_calls = [
-            ("queue.queue", "0 1"),
-            (
-                "request.metadata 0",
-                '''queue="primary"
-                rid="0"
-                status="ready"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
-            ),
-            (
-                "request.metadata 1",
-                '''queue="secondary"
-                rid="1"
-                status="ready"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
-            ),
-        ]
-
-        def side_effect(actual_command):
-            command, result = command_calls.pop(0)
-            self.assertEqual(command, actual_command)
-            return result
-
-        client = LiquidsoapClient()
-        client.command = mock.Mock(side_effect=side_effect)
+        command_calls = QUEUE_CALLS
+        client = mock_client(command_calls)
 
         result = client.queue()
         self.assertEqual(
             result,
             [
                 {
-                    "id": "4daabe44-6d48-47c4-a187-592cf048b039",
+                    "id": CLASSICS_ID,
                     "queue_id": "0",
                     "queue": "primary",
                 },
                 {
-                    "id": "4daabe44-6d48-47c4-a187-592cf048b039",
+                    "id": CLASSICS_ID,
                     "queue_id": "1",
                     "queue": "secondary",
                 },
             ],
         )
-        self.assertEqual(command_calls, [])
+        self.assertCommandsSent(client, command_calls)
 
     def testPush(self):
-        from klangbecken.player import LiquidsoapClient
-
-        command_calls = [
-            ("queue.push data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3", "1"),
-            (
-                "request.metadata 1",
-                '''queue="primary"
-                rid="1"
-                status="ready"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
-            ),
-        ]
-
-        def side_effect(actual_command):
-            command, result = command_calls.pop(0)
-            self.assertEqual(command, actual_command)
-            return result
-
-        client = LiquidsoapClient()
-        client.command = mock.Mock(side_effect=side_effect)
-        result = client.push("data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3")
+        command_calls = PUSH_CALLS
+        client = mock_client(command_calls)
+        result = client.push(CLASSICS_PATH)
         self.assertEqual(result, "1")
-        self.assertEqual(command_calls, [])
+        self.assertCommandsSent(client, command_calls)
 
     def testDelete(self):
-        from klangbecken.player import LiquidsoapClient
-
-        command_calls = [
-            ("queue.secondary_queue", "2 4"),
-            ("queue.remove 2", "OK"),
-            (
-                "request.metadata 2",
-                '''queue="secondary"
-                rid="2"
-                status="destroyed"
-                source="queue"
-                temporary="false"
-                filename="data/classics/4daabe44-6d48-47c4-a187-592cf048b039.mp3"''',
-            ),
-        ]
-
-        def side_effect(actual_command):
-            command, result = command_calls.pop(0)
-            self.assertEqual(command, actual_command)
-            return result
-
-        client = LiquidsoapClient()
-        client.command = mock.Mock(side_effect=side_effect)
+        command_calls = DELETE_CALLS
+        client = mock_client(command_calls)
         client.delete("2")
-        self.assertEqual(command_calls, [])
+        self.assertCommandsSent(client, command_calls)
 
     def testDeleteNotFound(self):
-        from klangbecken.player import LiquidsoapClient
-
-        command_calls = [
+        command_calls = (
             ("queue.secondary_queue", "2 4"),
             # Should not be called:
             # ("queue.remove 3", "ERROR: No such request in queue!"),
-        ]
-
-        def side_effect(actual_command):
-            command, result = command_calls.pop(0)
-            self.assertEqual(command, actual_command)
-            return result
+        )
 
-        client = LiquidsoapClient()
-        client.command = mock.Mock(side_effect=side_effect)
+        client = mock_client(command_calls)
         with self.assertRaises(NotFound):
             client.delete("3")
-        self.assertEqual(command_calls, [])
+        self.assertCommandsSent(client, command_calls)
@@ -1,7 +1,10 @@
+import collections
+import concurrent.futures
 import datetime
 import io
 import json
 import os
+import re
 import shutil
 import tempfile
 import unittest
@@ -9,21 +12,47 @@ import unittest
 from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import NotFound, UnprocessableEntity
 
+from klangbecken.playlist import (
+    FileAddition,
+    FileDeletion,
+    MetadataChange,
+    _extract_audio_quality,
+    check_processor,
+    ffmpeg_audio_analyzer,
+    file_tag_processor,
+    filter_duplicates_processor,
+    index_processor,
+    mutagen_tag_analyzer,
+    playlist_processor,
+    raw_file_analyzer,
+    raw_file_processor,
+    update_data_analyzer,
+)
+from klangbecken.settings import FILE_TYPES
+
+from .utils import TEMP_DIR
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "audio")
+
+HAVE_FFMPEG = shutil.which("ffmpeg") is not None
+
+entry_re = re.compile(r"[^/\n]+/[^/\n]+$", re.M)
+
 
 class AnalyzersTestCase(unittest.TestCase):
-    def setUp(self):
-        self.current_path = os.path.dirname(os.path.realpath(__file__))
-        fd, name = tempfile.mkstemp()
+    @classmethod
+    def setUpClass(cls):
+        # The invalid file is only read, thus share it between tests
+        fd, name = tempfile.mkstemp(dir=TEMP_DIR)
         os.write(fd, b"\0" * 1024)
         os.close(fd)
-        self.invalid_file = name
+        cls.invalid_file = name
 
-    def tearDown(self):
-        os.remove(self.invalid_file)
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.invalid_file)
 
     def testUpdateAnalyzer(self):
-        from klangbecken.playlist import MetadataChange, update_data_analyzer
-
         # Correct single update
         self.assertEqual(
             update_data_analyzer("playlist", "id", "ext", {"artist": "A"}),
@@ -68,10 +97,6 @@ class AnalyzersTestCase(unittest.TestCase):
         )
 
     def testRawFileAnalyzer(self):
-        import datetime
-
-        from klangbecken.playlist import FileAddition, MetadataChange, raw_file_analyzer
-
         # Missing file
         self.assertRaises(
             UnprocessableEntity, raw_file_analyzer, "music", "fileId", "mp3", None
@@ -86,9 +111,9 @@ class AnalyzersTestCase(unittest.TestCase):
         result = raw_file_analyzer("jingles", "fileId", "mp3", "xyz.temp")
 
         self.assertEqual(result[0], FileAddition("xyz.temp"))
-        self.assertTrue(MetadataChange("playlist", "jingles") in result)
-        self.assertTrue(MetadataChange("id", "fileId") in result)
-        self.assertTrue(MetadataChange("ext", "mp3") in result)
+        self.assertIn(MetadataChange("playlist", "jingles"), result)
+        self.assertIn(MetadataChange("id", "fileId"), result)
+        self.assertIn(MetadataChange("ext", "mp3"), result)
         import_timestamp = [
             ch
             for ch in result
@@ -97,48 +122,41 @@ class AnalyzersTestCase(unittest.TestCase):
         two_seconds_ago = datetime.datetime.now() - datetime.timedelta(seconds=2)
         two_seconds_ago = two_seconds_ago.isoformat()
         self.assertGreater(import_timestamp, two_seconds_ago)
-        self.assertTrue(MetadataChange("weight", 1) in result)
+        self.assertIn(MetadataChange("weight", 1), result)
 
     def testMutagenTagAnalyzer(self):
-        from klangbecken.playlist import MetadataChange as Change, mutagen_tag_analyzer
-
         # Test regular files
         for ext in ["mp3"]:
-            path = os.path.join(self.current_path, "audio", "silence." + ext)
-            changes = mutagen_tag_analyzer("music", "fileId", ext, path)
-            self.assertEqual(len(changes), 2)
-            self.assertIn(Change("artist", "Silence Artist"), changes)
-            self.assertIn(Change("title", "Silence Track"), changes)
+            with self.subTest(ext=ext):
+                path = os.path.join(AUDIO_DIR, "silence." + ext)
+                changes = mutagen_tag_analyzer("music", "fileId", ext, path)
+                self.assertEqual(len(changes), 2)
+                self.assertIn(MetadataChange("artist", "Silence Artist"), changes)
+                self.assertIn(MetadataChange("title", "Silence Track"), changes)
 
         # Test regular files with unicode tags
         for suffix in ["-jointstereo.mp3", "-stereo.mp3"]:
-            extra, ext = suffix.split(".")
-            name = "silence-unicode" + extra + "." + ext
-            path = os.path.join(self.current_path, "audio", name)
-            changes = mutagen_tag_analyzer("music", "fileId", ext, path)
-            self.assertEqual(len(changes), 2)
-            self.assertIn(Change("artist", "ÀÉÈ"), changes)
-            self.assertIn(Change("title", "ÄÖÜ"), changes)
+            with self.subTest(suffix=suffix):
+                extra, ext = suffix.split(".")
+                name = "silence-unicode" + extra + "." + ext
+                path = os.path.join(AUDIO_DIR, name)
+                changes = mutagen_tag_analyzer("music", "fileId", ext, path)
+                self.assertEqual(len(changes), 2)
+                self.assertIn(MetadataChange("artist", "ÀÉÈ"), changes)
+                self.assertIn(MetadataChange("title", "ÄÖÜ"), changes)
 
         # Test MP3 without any tags
-        path = os.path.join(self.current_path, "audio", "silence-stripped.mp3")
+        path = os.path.join(AUDIO_DIR, "silence-stripped.mp3")
         changes = mutagen_tag_analyzer("music", "fileId", "mp3", path)
         self.assertEqual(len(changes), 2)
-        self.assertIn(Change("artist", ""), changes)
-        self.assertIn(Change("title", ""), changes)
+        self.assertIn(MetadataChange("artist", ""), changes)
+        self.assertIn(MetadataChange("title", ""), changes)
 
         # Test invalid files
         with self.assertRaises(UnprocessableEntity):
             mutagen_tag_analyzer("music", "fileId", "mp3", self.invalid_file)
 
-    def _analyzeOneFile(self, prefix, postfix, gain, cue_in, cue_out):
-        from klangbecken.playlist import MetadataChange, ffmpeg_audio_analyzer
-
-        name = prefix + postfix.split(".")[0]
-        ext = postfix.split(".")[1]
-
-        path = os.path.join(self.current_path, "audio", name + "." + ext)
-        changes = ffmpeg_audio_analyzer("jingles", name, ext, path)
+    def _checkAnalysis(self, changes, gain, cue_in, cue_out):
         self.assertEqual(len(changes), 6)
         for change in changes:
             self.assertIsInstance(change, MetadataChange)
@@ -162,9 +180,8 @@ class AnalyzersTestCase(unittest.TestCase):
         self.assertGreater(float(changes["cue_out"]), cue_out - 0.02)
         self.assertLess(float(changes["cue_out"]), cue_out + 0.1)
 
+    @unittest.skipUnless(HAVE_FFMPEG, "ffmpeg not installed")
     def testFFmpegAudioAnalyzer(self):
-        from klangbecken.playlist import ffmpeg_audio_analyzer
-
         test_data = [
             {"prefix": "padded", "gain": -17, "cue_in": 0.2, "cue_out": 0.8},
             {"prefix": "padded-start", "gain": -3.33, "cue_in": 1, "cue_out": 2},
@@ -173,16 +190,31 @@ class AnalyzersTestCase(unittest.TestCase):
             {"prefix": "interleaved", "gain": -14.16, "cue_in": 0.2, "cue_out": 0.8},
             {"prefix": "unpadded-interleaved", "gain": -14, "cue_in": 0, "cue_out": 10},
         ]
+        test_data = [
+            dict(data, postfix=postfix)
+            for data in test_data
+            for postfix in "-jointstereo.mp3 -stereo.mp3".split()
+        ]
 
-        for data in test_data:
-            for ext in "-jointstereo.mp3 -stereo.mp3".split():
-                self._analyzeOneFile(postfix=ext, **data)
+        def analyze(data):
+            name = data["prefix"] + data["postfix"].split(".")[0]
+            ext = data["postfix"].split(".")[1]
+            path = os.path.join(AUDIO_DIR, name + "." + ext)
+            return ffmpeg_audio_analyzer("jingles", name, ext, path)
+
+        # The analysis runs in ffmpeg subprocesses, thus threads are enough to
+        # analyze all files in parallel.
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            results = executor.map(analyze, test_data)
+            for data, changes in zip(test_data, results):
+                with self.subTest(prefix=data["prefix"], postfix=data["postfix"]):
+                    self._checkAnalysis(
+                        changes, data["gain"], data["cue_in"], data["cue_out"]
+                    )
 
         # silence only file
         with self.assertRaises(UnprocessableEntity) as cm:
-            path = os.path.join(
-                self.current_path, "audio", "silence-unicode-stereo.mp3"
-            )
+            path = os.path.join(AUDIO_DIR, "silence-unicode-stereo.mp3")
             ffmpeg_audio_analyzer("music", "id1", "mp3", path)
         self.assertIn("track only contains silence", cm.exception.description.lower())
 
@@ -190,16 +222,15 @@ class AnalyzersTestCase(unittest.TestCase):
         with self.assertRaises(UnprocessableEntity):
             ffmpeg_audio_analyzer("music", "id1", "mp3", self.invalid_file)
 
+    @unittest.skipUnless(HAVE_FFMPEG, "ffmpeg not installed")
     def testFFmpegAudioAnalyzerAudioQuality(self):
-        from klangbecken.playlist import ffmpeg_audio_analyzer
-
         with self.assertRaises(UnprocessableEntity) as cm:
-            path = os.path.join(self.current_path, "audio", "not-an-audio-file.mp3")
+            path = os.path.join(AUDIO_DIR, "not-an-audio-file.mp3")
             ffmpeg_audio_analyzer("music", "id1", "mp3", path)
         self.assertIn("cannot process audio data", cm.exception.description.lower())
 
         with self.assertRaises(UnprocessableEntity) as cm:
-            path = os.path.join(self.current_path, "audio", "silence.wav")
+            path = os.path.join(AUDIO_DIR, "silence.wav")
             ffmpeg_audio_analyzer("music", "id1", "mp3", path)
         self.assertIn(
             "the track is not a valid mp3 file", cm.exception.description.lower()
@@ -207,7 +238,7 @@ class AnalyzersTestCase(unittest.TestCase):
         self.assertIn("ulaw", cm.exception.description.lower())
 
         with self.assertRaises(UnprocessableEntity) as cm:
-            path = os.path.join(self.current_path, "audio", "silence.ogg")
+            path = os.path.join(AUDIO_DIR, "silence.ogg")
             ffmpeg_audio_analyzer("music", "id1", "mp3", path)
         self.assertIn(
             "the track is not a valid mp3 file", cm.exception.description.lower()
@@ -215,48 +246,81 @@ class AnalyzersTestCase(unittest.TestCase):
         self.assertIn("vorbis", cm.exception.description.lower())
 
         with self.assertRaises(UnprocessableEntity) as cm:
-            path = os.path.join(self.current_path, "audio", "silence-32kHz.mp3")
+            path = os.path.join(AUDIO_DIR, "silence-32kHz.mp3")
             ffmpeg_audio_analyzer("music", "id1", "mp3", path)
         self.assertIn("invalid sample rate: 32", cm.exception.description.lower())
 
         with self.assertRaises(UnprocessableEntity) as cm:
-            path = os.path.join(self.current_path, "audio", "sine-unicode-mono.mp3")
+            path = os.path.join(AUDIO_DIR, "sine-unicode-mono.mp3")
             ffmpeg_audio_analyzer("music", "id1", "mp3", path)
         self.assertIn("stereo", cm.exception.description.lower())
 
-        path = os.path.join(self.current_path, "audio", "sine-unicode-mono.mp3")
+        path = os.path.join(AUDIO_DIR, "sine-unicode-mono.mp3")
         changes = ffmpeg_audio_analyzer("jingles", "id1", "mp3", path)
         self.assertEqual(len(changes), 6)
 
         with self.assertRaises(UnprocessableEntity) as cm:
-            path = os.path.join(self.current_path, "audio", "silence-112kbps.mp3")
+            path = os.path.join(AUDIO_DIR, "silence-112kbps.mp3")
             ffmpeg_audio_analyzer("music", "id1", "mp3", path)
         self.assertIn("bitrate too low: 112 < 128", cm.exception.description.lower())
 
+    def testExtractAudioQuality(self):
+        # Check the validation with stream descriptions as printed by ffmpeg
+        def output(audio):
+            return f"  Stream #0:0: Audio: {audio}\n"
+
+        stereo = output("mp3 (mp3float), 44100 Hz, stereo, fltp, 160 kb/s")
+        self.assertEqual(_extract_audio_quality(stereo, "music"), (2, 44100, 160))
+        mono = output("mp3 (mp3float), 48000 Hz, mono, fltp, 128 kb/s")
+        self.assertEqual(_extract_audio_quality(mono, "jingles"), (1, 48000, 128))
+
+        test_data = [
+            ("vorbis, 44100 Hz, stereo, fltp, 160 kb/s", "not a valid mp3 file"),
+            ("mp3 (mp3float), 32000 Hz, stereo, fltp, 160 kb/s", "sample rate: 32"),
+            ("mp3 (mp3float), 44100 Hz, mono, fltp, 160 kb/s", "stereo"),
+            ("mp3 (mp3float), 44100 Hz, stereo, fltp, 112 kb/s", "112 < 128"),
+        ]
+        for audio, msg in test_data:
+            with self.subTest(audio):
+                with self.assertRaises(UnprocessableEntity) as cm:
+                    _extract_audio_quality(output(audio), "music")
+                self.assertIn(msg, cm.exception.description.lower())
+
 
 class ProcessorsTestCase(unittest.TestCase):
-    def setUp(self):
-        self.tempdir = tempfile.mkdtemp()
-        os.mkdir(os.path.join(self.tempdir, "music"))
+    @classmethod
+    def setUpClass(cls):
+        # Removed on cleanup, or at the latest when garbage collected
+        cls.basedir = tempfile.TemporaryDirectory(dir=TEMP_DIR)
+
+        # Build the data directory once, and copy it for every test
+        cls.template = os.path.join(cls.basedir.name, "template")
+        os.mkdir(cls.template)
+        os.mkdir(os.path.join(cls.template, "music"))
 
-        current_path = os.path.dirname(os.path.realpath(__file__))
         for ext in ".mp3 -stripped.mp3".split():
             shutil.copyfile(
-                os.path.join(current_path, "audio", "silence" + ext),
-                os.path.join(self.tempdir, "music", "silence" + ext),
+                os.path.join(AUDIO_DIR, "silence" + ext),
+                os.path.join(cls.template, "music", "silence" + ext),
             )
 
-        with open(os.path.join(self.tempdir, "index.json"), "w") as f:
+        with open(os.path.join(cls.template, "index.json"), "w") as f:
             print("{}", file=f)
-        open(os.path.join(self.tempdir, "music.m3u"), "w").close()
-        open(os.path.join(self.tempdir, "jingles.m3u"), "w").close()
+        open(os.path.join(cls.template, "music.m3u"), "w").close()
+        open(os.path.join(cls.template, "jingles.m3u"), "w").close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.basedir.cleanup()
+
+    def setUp(self):
+        self.tempdir = os.path.join(self.basedir.name, self.id())
+        shutil.copytree(self.template, self.tempdir)
 
     def tearDown(self):
         shutil.rmtree(self.tempdir)
 
     def testCheckProcessor(self):
-        from klangbecken.playlist import MetadataChange, check_processor
-
         # Invalid key
         with self.assertRaises(UnprocessableEntity) as cm:
             check_processor(
@@ -313,13 +377,6 @@ class ProcessorsTestCase(unittest.TestCase):
             check_processor(self.tempdir, "playlist", "id", "ext", ["whatever"])
 
     def testFilterDuplicatesProcessor(self):
-        from klangbecken.playlist import (
-            FileAddition,
-            MetadataChange,
-            filter_duplicates_processor,
-            index_processor,
-        )
-
         file_ = FileStorage(io.BytesIO(b"abc"), "filename.mp3")
         changes = [
             FileAddition(file_),
@@ -333,16 +390,9 @@ class ProcessorsTestCase(unittest.TestCase):
         index_processor(self.tempdir, "music", "id1", ".mp3", changes)
         with self.assertRaises(UnprocessableEntity) as cm:
             filter_duplicates_processor(self.tempdir, "music", "id", "mp3", changes)
-        self.assertTrue("Duplicate file entry" in cm.exception.description)
+        self.assertIn("Duplicate file entry", cm.exception.description)
 
     def testRawFileProcessor(self):
-        from klangbecken.playlist import (
-            FileAddition,
-            FileDeletion,
-            MetadataChange,
-            raw_file_processor,
-        )
-
         filename = os.path.join(self.tempdir, "music", "silence.mp3")
         addition = FileAddition(filename)
         change = MetadataChange("key", "value")
@@ -356,7 +406,7 @@ class ProcessorsTestCase(unittest.TestCase):
         # File change (nothing happens) and deletion
         raw_file_processor(self.tempdir, "music", "id1", "mp3", [change])
         raw_file_processor(self.tempdir, "music", "id1", "mp3", [delete])
-        self.assertTrue(not os.path.isfile(path))
+        self.assertFalse(os.path.isfile(path))
 
         # Invalid change (not found)
         self.assertRaises(
@@ -368,16 +418,11 @@ class ProcessorsTestCase(unittest.TestCase):
             NotFound, raw_file_processor, self.tempdir, "music", "id1", "mp3", [delete]
         )
 
-    def testIndexProcessor(self):
-        from klangbecken.playlist import (
-            FileAddition,
-            FileDeletion,
-            MetadataChange,
-            index_processor,
-        )
-
-        index_path = os.path.join(self.tempdir, "index.json")
+    def _readIndex(self):
+        with open(os.path.join(self.tempdir, "index.json"), "rb") as f:
+            return json.load(f)
 
+    def testIndexProcessor(self):
         # Add two new files
         index_processor(
             self.tempdir, "music", "fileId1", "mp3", [FileAddition("filename.txt")]
@@ -386,11 +431,10 @@ class ProcessorsTestCase(unittest.TestCase):
             self.tempdir, "music", "fileId2", "mp3", [FileAddition("filename.txt")]
         )
 
-        with open(index_path) as f:
-            data = json.load(f)
+        data = self._readIndex()
 
-        self.assertTrue("fileId1" in data)
-        self.assertTrue("fileId2" in data)
+        self.assertIn("fileId1", data)
+        self.assertIn("fileId2", data)
 
         # Set some initial metadata
         index_processor(
@@ -404,14 +448,13 @@ class ProcessorsTestCase(unittest.TestCase):
             [MetadataChange("key1", "value1"), MetadataChange("key2", "value2")],
         )
 
-        with open(index_path) as f:
-            data = json.load(f)
+        data = self._readIndex()
 
-        self.assertTrue("key1" in data["fileId1"])
+        self.assertIn("key1", data["fileId1"])
         self.assertEqual(data["fileId1"]["key1"], "value1")
-        self.assertTrue("key1" in data["fileId2"])
+        self.assertIn("key1", data["fileId2"])
         self.assertEqual(data["fileId2"]["key1"], "value1")
-        self.assertTrue("key2" in data["fileId2"])
+        self.assertIn("key2", data["fileId2"])
         self.assertEqual(data["fileId2"]["key2"], "value2")
 
         # Modify metadata
@@ -430,26 +473,24 @@ class ProcessorsTestCase(unittest.TestCase):
             [MetadataChange("key2", "value2-1-œ")],
         )
 
-        with open(index_path) as f:
-            data = json.load(f)
+        data = self._readIndex()
 
-        self.assertTrue("key1" in data["fileId1"])
+        self.assertIn("key1", data["fileId1"])
         self.assertEqual(data["fileId1"]["key1"], "value1-1")
-        self.assertTrue("key2" in data["fileId1"])
+        self.assertIn("key2", data["fileId1"])
         self.assertEqual(data["fileId1"]["key2"], "value2-1")
-        self.assertTrue("key1" in data["fileId2"])
+        self.assertIn("key1", data["fileId2"])
         self.assertEqual(data["fileId2"]["key1"], "value1")
-        self.assertTrue("key2" in data["fileId2"])
+        self.assertIn("key2", data["fileId2"])
         self.assertEqual(data["fileId2"]["key2"], "value2-1-œ")
 
         # Delete one file
         index_processor(self.tempdir, "music", "fileId1", ".mp3", [FileDeletion()])
 
-        with open(index_path) as f:
-            data = json.load(f)
+        data = self._readIndex()
 
-        self.assertTrue("fileId1" not in data)
-        self.assertTrue("fileId2" in data)
+        self.assertNotIn("fileId1", data)
+        self.assertIn("fileId2", data)
 
         # Try duplicating file ids
         with self.assertRaisesRegex(UnprocessableEntity, "Duplicate"):
@@ -483,21 +524,11 @@ class ProcessorsTestCase(unittest.TestCase):
         with self.assertRaises(NotFound):
             index_processor(self.tempdir, "music", "fileIdXY", "mp3", [FileDeletion()])
 
-        with open(index_path) as f:
-            data = json.load(f)
-        self.assertTrue("fileId2" in data)
-        self.assertTrue("fileXY" not in data)
+        data = self._readIndex()
+        self.assertIn("fileId2", data)
+        self.assertNotIn("fileXY", data)
 
     def testFileTagProcessor(self):
-        from mutagen import File
-
-        from klangbecken.playlist import (
-            FileAddition,
-            FileDeletion,
-            MetadataChange,
-            file_tag_processor,
-        )
-
         # No-ops
         file_tag_processor(
             self.tempdir,
@@ -528,7 +559,9 @@ class ProcessorsTestCase(unittest.TestCase):
             prefix, ext = filename.split(".")
 
             path = os.path.join(self.tempdir, "music", filename)
-            mutagenfile = File(path, easy=True)
+            # Open the file with its known type, without sniffing the format
+            FileType = FILE_TYPES[ext]
+            mutagenfile = FileType(path)
 
             # Make sure tags are not already the same before updating
             for key, val in changes.items():
@@ -536,18 +569,17 @@ class ProcessorsTestCase(unittest.TestCase):
 
             # Update and verify tags
             file_tag_processor(self.tempdir, "music", prefix, ext, metadata_changes)
-            mutagenfile = File(path, easy=True)
+            mutagenfile = FileType(path)
             for key, val in changes.items():
                 self.assertEqual(len(mutagenfile.get(key, [""])), 1)
                 self.assertEqual(val, mutagenfile.get(key, [""])[0])
 
-    def testPlaylistProcessor(self):
-        from klangbecken.playlist import (
-            FileDeletion,
-            MetadataChange,
-            playlist_processor,
-        )
+    def _readEntries(self, path):
+        # Count the playlist entries by their last two path components
+        with open(path) as f:
+            return collections.Counter(entry_re.findall(f.read()))
 
+    def testPlaylistProcessor(self):
         music_path = os.path.join(self.tempdir, "music.m3u")
         jingles_path = os.path.join(self.tempdir, "jingles.m3u")
 
@@ -556,10 +588,7 @@ class ProcessorsTestCase(unittest.TestCase):
             self.tempdir, "music", "fileId1", "mp3", [MetadataChange("weight", 2)]
         )
 
-        with open(music_path) as f:
-            lines = f.read().split("\n")
-        entries = [ln for ln in lines if ln.endswith("music/fileId1.mp3")]
-        self.assertEqual(len(entries), 2)
+        self.assertEqual(self._readEntries(music_path)["music/fileId1.mp3"], 2)
 
         with open(jingles_path) as f:
             data = f.read()
@@ -570,10 +599,7 @@ class ProcessorsTestCase(unittest.TestCase):
             self.tempdir, "music", "fileId1", "mp3", [MetadataChange("weight", 4)]
         )
 
-        with open(music_path) as f:
-            lines = f.read().split("\n")
-        entries = [ln for ln in lines if ln.endswith("music/fileId1.mp3")]
-        self.assertEqual(len(entries), 4)
+        self.assertEqual(self._readEntries(music_path)["music/fileId1.mp3"], 4)
 
         with open(jingles_path) as f:
             data = f.read()
@@ -609,45 +635,37 @@ class ProcessorsTestCase(unittest.TestCase):
             self.tempdir, "jingles", "fileId5", "mp3", [MetadataChange("weight", 3)]
         )
 
-        with open(music_path) as f:
-            lines = [ln.strip() for ln in f.readlines()]
-        entries = [ln for ln in lines if ln.endswith("music/fileId1.mp3")]
-        self.assertEqual(len(entries), 2)
-        entries = [ln for ln in lines if ln.endswith("music/fileId2.mp3")]
-        self.assertEqual(len(entries), 1)
-        entries = [ln for ln in lines if ln.endswith("music/fileId3.mp3")]
-        self.assertEqual(len(entries), 3)
+        entries = self._readEntries(music_path)
+        self.assertEqual(entries["music/fileId1.mp3"], 2)
+        self.assertEqual(entries["music/fileId2.mp3"], 1)
+        self.assertEqual(entries["music/fileId3.mp3"], 3)
 
-        with open(jingles_path) as f:
-            lines = [ln.strip() for ln in f.readlines()]
-        entries = [ln for ln in lines if ln.endswith("jingles/fileId4.mp3")]
-        self.assertEqual(len(entries), 2)
-        entries = [ln for ln in lines if ln.endswith("jingles/fileId5.mp3")]
-        self.assertEqual(len(entries), 3)
+        entries = self._readEntries(jingles_path)
+        self.assertEqual(entries["jingles/fileId4.mp3"], 2)
+        self.assertEqual(entries["jingles/fileId5.mp3"], 3)
 
         # Delete non existing file (must be possible)
         playlist_processor(self.tempdir, "music", "fileIdXY", "mp3", [FileDeletion()])
         with open(music_path) as f:
-            lines = [ln.strip() for ln in f.readlines()]
+            lines = f.read().splitlines()
         self.assertEqual(len(lines), 6)
         self.assertTrue(all(lines))
 
         with open(jingles_path) as f:
-            lines = [ln.strip() for ln in f.readlines()]
+            lines = f.read().splitlines()
         self.assertEqual(len(lines), 5)
         self.assertTrue(all(lines))
 
         # Delete existing file
         playlist_processor(self.tempdir, "music", "fileId1", "mp3", [FileDeletion()])
         with open(music_path) as f:
-            lines = [ln.strip() for ln in f.readlines()]
+            lines = f.read().splitlines()
         self.assertEqual(len(lines), 4)
         self.assertTrue(all(lines))
-        entries = [ln for ln in lines if ln.endswith("music/fileId1.mp3")]
-        self.assertListEqual(entries, [])
+        self.assertNotIn("music/fileId1.mp3", self._readEntries(music_path))
 
         with open(jingles_path) as f:
-            lines = [ln.strip() for ln in f.readlines()]
+            lines = f.read().splitlines()
         self.assertEqual(len(lines), 5)
         self.assertTrue(all(lines))
 
@@ -657,7 +675,7 @@ class ProcessorsTestCase(unittest.TestCase):
         playlist_processor(self.tempdir, "jingles", "fileId5", "mp3", [FileDeletion()])
 
         with open(music_path) as f:
-            lines = [ln.strip() for ln in f.readlines()]
+            lines = f.read().splitlines()
         self.assertEqual(len(lines), 1)
         self.assertTrue(lines[0].endswith("music/fileId2.mp3"))
 
@@ -1,34 +1,31 @@
 import contextlib
 import io
-import sys
+import os
+
+# Optional directory for temporary test files, e.g. a RAM-backed tmpfs.
+# Defaults to the standard location (honoring TMPDIR).
+TEMP_DIR = os.environ.get("KLANGBECKEN_TEST_TEMP_DIR") or None
 
 
 @contextlib.contextmanager
 def capture(command, *args, **kwargs):
-    out, sys.stdout = sys.stdout, io.StringIO()
-    err, sys.stderr = sys.stderr, io.StringIO()
+    out, err = io.StringIO(), io.StringIO()
     commandException = None
     contextException = None
     ret = None
-    try:
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
         try:
             ret = command(*args, **kwargs)
         except BaseException as e:
             # Catch any exception, store it for now, and first capture
             # all the output, before re-raising the exception.
             commandException = e
-        sys.stdout.seek(0)
-        sys.stderr.seek(0)
-        out_data = sys.stdout.read()
-        err_data = sys.stderr.read()
-        sys.stdout = out
-        sys.stderr = err
-        try:
-            yield out_data, err_data, ret
-        except BaseException as e:
-            # Catch any exception thrown from within the context manager
-            # (often unittest assertions), and re-raise it later unmodified.
-            contextException = e
+    try:
+        yield out.getvalue(), err.getvalue(), ret
+    except BaseException as e:
+        # Catch any exception thrown from within the context manager
+        # (often unittest assertions), and re-raise it later unmodified.
+        contextException = e
     finally:
         # Do not ignore exceptions from within the context manager,
         # in case of a deliberately failing command.